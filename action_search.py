@@ -1,12 +1,53 @@
 import asyncio
 import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import msgspec
+import orjson
+
+try:
+    import uvloop
+except ImportError:  # uvloop опционален (на Windows его нет) — тогда работает стандартный event loop
+    uvloop = None
 
 from client import SearchClient
-from parser import DocumentParser
+from parser import DocumentParser, clean_text
 from schemas import SearchParams
 
 logger = logging.getLogger(__name__)
 
+_PARSER = DocumentParser()
+_PARSE_POOL: ProcessPoolExecutor | None = None
+
+
+def new_process_pool() -> ProcessPoolExecutor:
+    """
+    Пул процессов для CPU-bound работы (парсинг документов здесь, извлечение текста в yandex_search).
+
+    Старт через forkserver (spawn там, где его нет, — на Windows), а не fork: воркеры создаются по требованию,
+    когда в процессе уже работают потоки (asyncio.to_thread, поток event loop сервиса "search-service-loop"),
+    и fork унаследовал бы захваченные ими блокировки.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(mp_context=multiprocessing.get_context(method))
+
+
+def _get_parse_pool() -> ProcessPoolExecutor:
+    global _PARSE_POOL
+    if _PARSE_POOL is None:
+        _PARSE_POOL = new_process_pool()
+    return _PARSE_POOL
+
+
+def _parse_one(document: bytes) -> tuple[str, str]:
+    """Декодирует и парсит один документ в процессе пула: возвращает (plain_text, title)."""
+    doc_response = orjson.loads(document)
+    plain = _PARSER.parse(doc_response)
+    title = clean_text(doc_response["document"]["content"]["title"])
+    return plain, title
+
 
 class ActionSearchClient:
     """
@@ -19,28 +60,38 @@ class ActionSearchClient:
     """
 
     def __init__(self) -> None:
-        self.parser = DocumentParser()
+        self.client = SearchClient()
+        # Постоянный event loop для синхронной обёртки (на uvloop, если он есть): общий AsyncClient и его
+        # соединения живут между вызовами, а asyncio.run создавал бы и закрывал loop на каждый вызов
+        self._runner = asyncio.Runner(loop_factory=uvloop.new_event_loop if uvloop is not None else None)
+        self._runner_lock = threading.Lock()
 
     def search(self, *, search_params: SearchParams, pages: int = 1) -> dict[str, object]:
-        """Синхронная обёртка для async поиска."""
-        return asyncio.run(self.search_async(search_params=search_params, pages=pages))
+        """Синхронная обёртка для async поиска. Вызовы из разных потоков выполняются по очереди."""
+        with self._runner_lock:
+            return self._runner.run(self.search_async(search_params=search_params, pages=pages))
+
+    def close(self) -> None:
+        """Закрывает HTTP-клиент синхронной обёртки и её event loop; после этого search() недоступен."""
+        with self._runner_lock:
+            self._runner.run(SearchClient.aclose())
+            self._runner.close()
 
     async def search_async(self, *, search_params: SearchParams, pages: int = 1) -> dict[str, object]:
         """
         Выполняет поиск и парсинг документов через Action API.
         """
-        client = SearchClient()
-
-        doc_results = await client.fetch_search_pages_and_docs(
+        doc_results = await self.client.fetch_search_pages_and_docs(
             search_params=search_params,
             pages=pages,
         )
         parsed = []
         errors = []
 
+        fetched = []
         for search_result in doc_results:
             if search_result.error is not None:
-                item_dict = search_result.item.model_dump()
+                item_dict = msgspec.to_builtins(search_result.item)
                 errors.append({"item": item_dict, "error": search_result.error})
                 logger.error(
                     "doc fetch error | moduleId=%s id=%s | %s",
@@ -49,34 +100,48 @@ class ActionSearchClient:
                     search_result.error,
                 )
                 continue
-            try:
-                search_item = search_result.item
-                doc_response = search_result.document
-
-                plain = self.parser.parse(doc_response)
-                title = self.parser._clean_text(doc_response["document"]["content"]["title"])
-
-                out = {
-                    "id": search_item.id,
-                    "moduleId": search_item.moduleId,
-                    "api_url": search_item.url,
-                    "title": title,
-                    "plain_text": plain,
-                }
-                parsed.append(out)
-
-                # Лог итогового документа
+            fetched.append(search_result)
+
+        # Парсинг CPU-bound, поэтому выполняется в пуле процессов, не блокируя event loop
+        loop = asyncio.get_running_loop()
+        pool = _get_parse_pool()
+        outcomes = await asyncio.gather(
+            *(loop.run_in_executor(pool, _parse_one, search_result.document) for search_result in fetched),
+            return_exceptions=True,
+        )
+
+        for search_result, outcome in zip(fetched, outcomes):
+            search_item = search_result.item
+            if isinstance(outcome, BaseException):
+                item_dict = msgspec.to_builtins(search_item)
+                errors.append({"item": item_dict, "error": f"parse error: {outcome}"})
+                logger.error(
+                    "parse error | moduleId=%s id=%s",
+                    search_item.moduleId,
+                    search_item.id,
+                    exc_info=outcome,
+                )
+                continue
+
+            plain, title = outcome
+            out = {
+                "id": search_item.id,
+                "moduleId": search_item.moduleId,
+                "api_url": search_item.url,
+                "title": title,
+                "plain_text": plain,
+            }
+            parsed.append(out)
+
+            # Лог итогового документа
+            if logger.isEnabledFor(logging.INFO):
                 title_str = (out["title"] or "") if isinstance(out["title"], str) else ""
                 snippet = plain[:800] + ("…" if len(plain) > 800 else "")
                 logger.info("DOC #%s/%s | %s\n%s", out["moduleId"], out["id"], title_str, snippet)
 
-            except Exception as e:
-                item_dict = search_result.item.model_dump()
-                errors.append({"item": item_dict, "error": f"parse error: {e}"})
-                logger.exception("parse error | moduleId=%s id=%s", search_result.item.moduleId, search_result.item.id)
-
         return {
-            "items": [result.item.model_dump() for result in doc_results],
+            # SearchItem как есть: сериализация (msgspec.to_builtins) — на стороне вызывающего, если она нужна
+            "items": [result.item for result in doc_results],
             "parsed": parsed,
             "errors": errors,
         }
@@ -89,9 +154,8 @@ if __name__ == "__main__":
     logging.getLogger("httpx").setLevel(logging.DEBUG)
     logging.getLogger("httpcore").setLevel(logging.DEBUG)
 
+    action_client = ActionSearchClient()
     try:
-        action_client = ActionSearchClient()
-
         # Пример использования с явными параметрами
         params = SearchParams(
             pubAlias="bss.plus",
@@ -107,18 +171,20 @@ if __name__ == "__main__":
 
         result = action_client.search(search_params=params, pages=1)
 
-        logging.info(f"\nВсего результатов: {len(result['items'])}")
-        logging.info(f"Успешно распарсено: {len(result['parsed'])}")
-        logging.info(f"Ошибок: {len(result['errors'])}")
+        logging.info("\nВсего результатов: %s", len(result["items"]))
+        logging.info("Успешно распарсено: %s", len(result["parsed"]))
+        logging.info("Ошибок: %s", len(result["errors"]))
 
         for i, doc in enumerate(result["parsed"][:3], 1):
-            logging.info(f"\n--- Документ #{i} ---")
-            logging.info(f"ID: {doc['moduleId']}/{doc['id']}")
-            logging.info(f"Заголовок: {doc['title']}")
-            logging.info(f"Текст: {doc['plain_text'][:200]}{'...' if len(doc['plain_text']) > 200 else ''}")
+            logging.info("\n--- Документ #%s ---", i)
+            logging.info("ID: %s/%s", doc["moduleId"], doc["id"])
+            logging.info("Заголовок: %s", doc["title"])
+            logging.info("Текст: %s%s", doc["plain_text"][:200], "..." if len(doc["plain_text"]) > 200 else "")
 
     except Exception as e:
-        logging.error(f"\nПроизошла ошибка во время теста: {e}")
+        logging.error("\nПроизошла ошибка во время теста: %s", e)
         import traceback
 
         traceback.print_exc()
+    finally:
+        action_client.close()
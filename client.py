@@ -1,9 +1,14 @@
 import asyncio
-from collections.abc import Iterable
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+from typing import Generic, TypeVar
 
 import httpx
+import msgspec
 
-from schemas import SearchItem, SearchParams, SearchResult
+from schemas import SearchItem, SearchPageResponse, SearchParams, SearchResult
+
+T = TypeVar("T")
 
 SEARCH_URL = "https://1gl.ru/system/content/search-new/"
 DOC_API_URL = "https://site-backend-ss.prod.ss.aservices.tech/api/v1/desktop/document_get-by-id"
@@ -20,27 +25,81 @@ HEADERS = {
 }
 
 
+def _bad_json_error(resp: httpx.Response, exc: Exception) -> httpx.HTTPError:
+    ct = resp.headers.get("content-type", "")
+    snippet = resp.content[:300]
+    return httpx.HTTPError(f"Bad JSON ({exc}). Content-type: {ct}. Snippet: {snippet!r}")
+
+
+class LoopLocal(Generic[T]):
+    """
+    Общий объект (HTTP-клиент, сессия) по одному на event loop: keep-alive соединения переживают отдельные поиски.
+    Объект привязан к loop, в котором создан, поэтому у каждого loop свой; закрывать его нужно в том же loop
+    (pop() и закрытие) до остановки loop — иначе сокеты утекут вместе с закрытым loop.
+    """
+
+    def __init__(self) -> None:
+        self._by_loop: dict[asyncio.AbstractEventLoop, T] = {}
+
+    def get(self) -> T | None:
+        return self._by_loop.get(asyncio.get_running_loop())
+
+    def set(self, value: T) -> T:
+        # Объекты уже закрытых loop использовать нельзя — только забыть
+        for stale_loop in [lp for lp in self._by_loop if lp.is_closed()]:
+            del self._by_loop[stale_loop]
+        self._by_loop[asyncio.get_running_loop()] = value
+        return value
+
+    def pop(self) -> T | None:
+        return self._by_loop.pop(asyncio.get_running_loop(), None)
+
+
 class SearchClient:
+    # Общий для всех экземпляров AsyncClient (HTTP/2, keep-alive); закрывается через aclose()
+    _clients: LoopLocal[httpx.AsyncClient] = LoopLocal()
+
     def __init__(self) -> None:
         self.timeout = 15.0
         self.max_connections = 50
+        # Лимит одновременных запросов документов в одном поиске: лишние ждут на семафоре, а не в очереди пула httpx
+        self._sem_size = self.max_connections
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        client = self._clients.get()
+        if client is None or client.is_closed:
+            limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+            client = self._clients.set(
+                httpx.AsyncClient(
+                    headers=HEADERS,
+                    limits=limits,
+                    timeout=httpx.Timeout(self.timeout),
+                    follow_redirects=True,
+                    http2=True,
+                )
+            )
+        return client
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """Закрывает AsyncClient текущего event loop."""
+        client = cls._clients.pop()
+        if client is not None:
+            await client.aclose()
 
     @staticmethod
-    def _extract_items(search_page_json: dict[str, object]) -> list[dict[str, object]]:
+    def _extract_items(search_page: SearchPageResponse) -> list[SearchItem]:
         """Extract items from search page response."""
-        items = search_page_json["data"]["searchResponse"]["items"]
-        if not isinstance(items, list):
-            return []
+        return search_page.data.searchResponse.items or []
 
-        # Validate and convert items to dicts
-        validated_items = []
-        for item in items:
-            validated_items.append(SearchItem.model_validate(item).model_dump())
-        return validated_items
+    @staticmethod
+    def _doc_url_prefix(base_doc_url: str) -> str:
+        """Общая для всех документов поиска часть URL — строится один раз на поиск."""
+        return f"{base_doc_url}?moduleId="
 
     @staticmethod
-    def _build_doc_url(base_doc_url: str, module_id: int | str, document_id: int | str) -> str:
-        return f"{base_doc_url}?moduleId={module_id}&documentId={document_id}"
+    def _build_doc_url(doc_url_prefix: str, module_id: int | str, document_id: int | str) -> str:
+        return f"{doc_url_prefix}{module_id}&documentId={document_id}"
 
     async def _search_pages(
         self,
@@ -49,55 +108,53 @@ class SearchClient:
         base_search_url: str,
         search_params: SearchParams,
         pages: int,
-    ) -> list[dict[str, object]]:
+    ) -> AsyncIterator[SearchPageResponse]:
+        """Запрашивает страницы поиска параллельно и отдаёт их по мере готовности."""
         if pages <= 0:
-            return []
-
-        async def fetch_page(p: int) -> dict[str, object]:
-            resp = await client.get(base_search_url, params={**search_params.model_dump(exclude_none=True), "page": p})
-            resp.raise_for_status()
-            ct = resp.headers.get("content-type", "")
-            if "application/json" not in ct:
-                snippet = resp.text[:300].replace("\n", " ")
-                raise httpx.HTTPError(f"Unexpected content-type: {ct}. Snippet: {snippet!r}")
-
-            return resp.json()
+            return
 
-        return await asyncio.gather(*[asyncio.create_task(fetch_page(p)) for p in range(1, pages + 1)])
+        base_params = search_params.model_dump(exclude_none=True)
+        # URL страниц собираются заранее, и client.get не приходится мержить params при каждом запросе
+        page_urls = [httpx.URL(base_search_url, params={**base_params, "page": p}) for p in range(1, pages + 1)]
 
-    async def _fetch_docs(
+        async def fetch_page(url: httpx.URL) -> SearchPageResponse:
+            resp = await client.get(url)
+            resp.raise_for_status()
+            # content-type не проверяем заранее: тело трогается только если декодирование упало.
+            # strict=False: числа и bool в виде строк ("3", "0.5", "true") приводятся, как это делал pydantic
+            try:
+                return msgspec.json.decode(resp.content, type=SearchPageResponse, strict=False)
+            except msgspec.DecodeError as e:
+                raise _bad_json_error(resp, e) from e
+
+        # Задачи создаются явно (а не внутри as_completed), чтобы отменить оставшиеся при ошибке или прерванной итерации
+        tasks = [asyncio.create_task(fetch_page(url)) for url in page_urls]
+        try:
+            for page in asyncio.as_completed(tasks):
+                yield await page
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _fetch_doc(
         self,
         *,
         client: httpx.AsyncClient,
-        items: Iterable[dict[str, object]],
-        base_doc_url: str,
-    ) -> list[SearchResult]:
-        results = []
-
-        async def fetch_one(item: dict[str, object]) -> None:
-            module_id = item.get("moduleId")
-            doc_id = item.get("id")
-
-            url = self._build_doc_url(base_doc_url, module_id, doc_id)
-            item_with_url = {**dict(item), "url": url}
-
-            search_item = SearchItem.model_validate(item_with_url)
-
-            try:
+        search_item: SearchItem,
+        doc_url_prefix: str,
+        sem: asyncio.Semaphore,
+    ) -> SearchResult:
+        url = search_item.url = self._build_doc_url(doc_url_prefix, search_item.moduleId, search_item.id)
+
+        try:
+            async with sem:
                 resp = await client.get(url)
-                resp.raise_for_status()
-                ct = resp.headers.get("content-type", "")
-                if "application/json" not in ct:
-                    snippet = resp.text[:300].replace("\n", " ")
-                    raise httpx.HTTPError(f"Unexpected content-type: {ct}. Snippet: {snippet!r}")
-                json_data = resp.json()
-
-                results.append(SearchResult(item=search_item, document=json_data, error=None))
-            except Exception as e:
-                results.append(SearchResult(item=search_item, document=None, error=str(e)))
+            resp.raise_for_status()
 
-        await asyncio.gather(*[asyncio.create_task(fetch_one(it)) for it in items])
-        return results
+            # Тело документа хранится как есть: JSON декодируется позже, в воркере парсинга
+            return SearchResult(item=search_item, document=resp.content, error=None)
+        except Exception as e:
+            return SearchResult(item=search_item, document=None, error=str(e))
 
     async def fetch_search_pages_and_docs(
         self,
@@ -107,21 +164,27 @@ class SearchClient:
         base_search_url: str = SEARCH_URL,
         base_doc_url: str = DOC_API_URL,
     ) -> list[SearchResult]:
-        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
-        timeout_cfg = httpx.Timeout(self.timeout)
-
-        async with httpx.AsyncClient(
-            headers=HEADERS, limits=limits, timeout=timeout_cfg, follow_redirects=True, http2=True
-        ) as client:
-            pages_json = await self._search_pages(
-                client=client,
-                base_search_url=base_search_url,
-                search_params=search_params,
-                pages=pages,
-            )
-
-            all_items = []
-            for pj in pages_json:
-                all_items.extend(self._extract_items(pj))
-
-            return await self._fetch_docs(client=client, items=all_items, base_doc_url=base_doc_url)
+        client = await self._get_client()
+
+        # Документы запрашиваются сразу по мере прихода каждой страницы, не дожидаясь остальных.
+        doc_tasks: list[asyncio.Task[SearchResult]] = []
+        sem = asyncio.Semaphore(self._sem_size)
+        doc_url_prefix = self._doc_url_prefix(base_doc_url)
+        pages_iter = self._search_pages(
+            client=client,
+            base_search_url=base_search_url,
+            search_params=search_params,
+            pages=pages,
+        )
+        try:
+            async with aclosing(pages_iter):
+                async for page in pages_iter:
+                    for item in self._extract_items(page):
+                        doc = self._fetch_doc(client=client, search_item=item, doc_url_prefix=doc_url_prefix, sem=sem)
+                        doc_tasks.append(asyncio.create_task(doc))
+        except BaseException:
+            for task in doc_tasks:
+                task.cancel()
+            raise
+
+        return await asyncio.gather(*doc_tasks)
@@ -2,59 +2,120 @@ import json
 import logging
 import re
 
+import orjson
+
 logger = logging.getLogger(__name__)
 
+_TEXT_BLOCK_TYPES = frozenset(
+    {
+        "p",
+        "list",
+        "headerblock",
+        "warning",
+        "opinion",
+        "advice",
+        "example",
+        "moreAbout",
+        "reason",
+        "operInfo",
+        "importantContent",
+        "fullAnswerHL",
+        "documentRoot",
+        "phrase",
+    }
+)
+_SKIP_TYPES = frozenset({"image", "div"})
+
+_OUTSIDE = object()
+_INSIDE = object()
+_EMIT_TEXT = object()
+
+_CLEAN_PATTERNS = tuple(
+    (re.compile(pat), repl)
+    for pat, repl in (
+        (r"\s+([,.;:)\]])", r"\1"),  # пробелы перед пунктуацией
+        (r"([(\[])\s+", r"\1"),  # пробелы после открывающих скобок
+        (r"([;:])(?!\s|$)", r"\1 "),  # пробел после ; :
+    )
+)
+_MULTI_SPACE = re.compile(r" {2,}")
+_TRAIL_PUNCT = re.compile(r"(?:;|:)\s*$")
+
+
+def clean_text(text: str) -> str:
+    # Литеральные замены — без regex
+    s = text.replace("&#160;", " ")  # HTML-nbsp
+    s = s.replace(";...", "; ...")  # ;... → ; ...
+
+    for pat, repl in _CLEAN_PATTERNS:
+        s = pat.sub(repl, s)
+
+    # NBSP
+    s = s.replace("\xa0 ", "\xa0").replace(" \xa0", "\xa0")
+    s = _MULTI_SPACE.sub(" ", s)
+
+    # Многоточие, если заканчивается на ; или :
+    if _TRAIL_PUNCT.search(s):
+        s = _TRAIL_PUNCT.sub(" ...", s)
+        s = _MULTI_SPACE.sub(" ", s)
+
+    return s
+
 
 class DocumentParser:
-    def __init__(self):
-        self.texts = []
+    """
+    Парсер документов Action API. Не хранит состояния между вызовами:
+    тексты локальны для каждого parse(), поэтому один экземпляр можно
+    использовать для любого числа документов, в том числе параллельно.
+    """
 
     def parse(self, document: dict) -> str:
         try:
-            if "document" in document:
-                self._process_document(document["document"])
-
-            return self._concatenate_and_clean_texts()
+            return self._concatenate_and_clean_texts(self.extract_texts(document))
 
         except Exception as e:
             logger.warning(f"Error processing document: {e}")
             return ""
 
-    def _process_document(self, document: dict):
+    def extract_texts(self, document: dict) -> list[str]:
+        texts: list[str] = []
+        if "document" in document:
+            self._process_document(document["document"], texts)
+        return texts
+
+    def _process_document(self, document: dict, texts: list[str]):
         if "content" not in document:
             return
 
         content = document["content"]
 
         if "snippetsInfo" in content:
-            self._process_snippets_info(content["snippetsInfo"])
+            self._process_snippets_info(content["snippetsInfo"], texts)
 
         if "body" in content:
-            self._process_content_body(content)
+            self._process_content_body(content, texts)
 
         try:
-            self._process_documents_element(document)
+            self._process_documents_element(document, texts)
         except Exception as e:
             logger.warning(f"Warning: Could not process documents element: {e}")
 
         try:
-            self._process_snippet_element(document)
+            self._process_snippet_element(document, texts)
         except Exception as e:
             logger.warning(f"Warning: Could not process snippets: {e}")
 
-    def _process_snippets_info(self, snippets_info: list):
+    def _process_snippets_info(self, snippets_info: list, texts: list[str]):
         for snippet_info in snippets_info:
             if "content" in snippet_info:
-                snippet_content = snippet_info["content"]
-                view_type = snippet_content.get("options", {}).get("viewType", "unknown")
-                self._extract_texts_from_children(snippet_content, view_type)
+                self._extract_texts_from_children(snippet_info["content"], texts)
 
-    def _process_content_body(self, content_element):
+    def _process_content_body(self, content_element, texts: list[str]):
         if isinstance(content_element, str):
-            content_body = json.loads(content_element)
+            content_body = orjson.loads(content_element)
         elif isinstance(content_element, dict) and "body" in content_element:
             if isinstance(content_element["body"], str):
-                content_body = json.loads(content_element["body"])
+                content_body = orjson.loads(content_element["body"])
             else:
                 content_body = content_element["body"]
         else:
@@ -63,69 +124,52 @@ class DocumentParser:
         if "children" not in content_body:
             return
 
-        options = content_body.get("options", {})
-        view_type = options.get("viewType")
-
-        if view_type in ["situation", "searchArt", "snippet"]:
-            count_attr = f"{view_type}_count"
-            current_count = getattr(self, count_attr, 0) + 1
-            setattr(self, count_attr, current_count)
-            view_type = f"{view_type}_{current_count}"
-
-        valid_children = [ch for ch in content_body["children"] if ch["type"] not in ["image", "div"]]
-        self._extract_texts_from_children(valid_children, view_type)
-
-    def _extract_texts_from_children(self, children_data, view_type):
-        if isinstance(children_data, dict):
-            current_type = children_data.get("type")
-            if current_type in [
-                "p",
-                "list",
-                "headerblock",
-                "warning",
-                "opinion",
-                "advice",
-                "example",
-                "moreAbout",
-                "reason",
-                "operInfo",
-                "importantContent",
-                "fullAnswerHL",
-                "documentRoot",
-                "phrase",
-            ]:
-                self._extract_text_from_element(children_data, view_type, current_type)
-
-        elif isinstance(children_data, list):
-            for child in children_data:
-                self._extract_texts_from_children(child, view_type)
-
-    def _extract_text_from_element(self, element: dict, view_type: str, tag: str):
-        if element["type"] in ["phrase", "list"]:
-            if "options" in element and "number" in element["options"]:
-                self.texts.append(f"number_{element['options']['number']}_view_type_{view_type}_tag_{tag}")
-
-        if "children" in element:
-            for child in element["children"]:
-                self._extract_text_from_element(child, view_type, tag)
-
-        if element["type"] == "text" and "options" in element and "value" in element["options"]:
-            text_value = element["options"]["value"]
-            if text_value:
-                self.texts.append(text_value)
-
-    def _process_documents_element(self, documents_element: dict):
-        if not isinstance(documents_element, dict):
-            return
-
-        if "content" in documents_element:
-            self._process_content_body(documents_element["content"])
+        # Стек обхода заполняется детьми сразу, без промежуточного отфильтрованного списка
+        stack = [(ch, _OUTSIDE) for ch in reversed(content_body["children"]) if ch["type"] not in _SKIP_TYPES]
+        self._walk(stack, texts)
 
-        if "documents" in documents_element and documents_element["documents"]:
-            for inner_document in documents_element["documents"]:
-                self._process_documents_element(inner_document)
+    def _extract_texts_from_children(self, children_data, texts: list[str]):
+        self._walk([(children_data, _OUTSIDE)], texts)
 
-    def _process_snippet_element(self, documents_element: dict):
+    @staticmethod
+    def _walk(stack: list, texts: list[str]):
+        # Обход в глубину через явный стек: (узел, состояние). _OUTSIDE — узел ещё не внутри текстового блока,
+        # _INSIDE — внутри блока, _EMIT_TEXT — отложенное значение узла "text", добавляемое после его детей.
+        while stack:
+            node, state = stack.pop()
+
+            if state is _EMIT_TEXT:
+                texts.append(node)
+                continue
+
+            if state is _OUTSIDE:
+                if isinstance(node, list):
+                    stack.extend((child, _OUTSIDE) for child in reversed(node))
+                    continue
+                if not isinstance(node, dict) or node.get("type") not in _TEXT_BLOCK_TYPES:
+                    continue
+
+            options = node.get("options")
+            if node["type"] == "text" and options is not None and "value" in options and options["value"]:
+                stack.append((options["value"], _EMIT_TEXT))
+
+            if "children" in node:
+                stack.extend((child, _INSIDE) for child in reversed(node["children"]))
+
+    def _process_documents_element(self, documents_element: dict, texts: list[str]):
+        stack = [documents_element]
+        while stack:
+            element = stack.pop()
+            if not isinstance(element, dict):
+                continue
+
+            if "content" in element:
+                self._process_content_body(element["content"], texts)
+
+            if "documents" in element and element["documents"]:
+                stack.extend(reversed(element["documents"]))
+
+    def _process_snippet_element(self, documents_element: dict, texts: list[str]):
         if not isinstance(documents_element, dict):
             return
 
@@ -133,43 +177,11 @@ class DocumentParser:
             content = documents_element["content"]
             if "snippets" in content:
                 for snippet in content["snippets"]:
-                    self._process_content_body(snippet["content"])
-
-    def _concatenate_and_clean_texts(self) -> str:
-        text_content = []
-        for text in self.texts:
-            if not text.startswith("number_") or "_view_type_" not in text:
-                text_content.append(text)
-
-        combined_text = " ".join(text_content)
-        return self._clean_text(combined_text)
+                    self._process_content_body(snippet["content"], texts)
 
     @staticmethod
-    def _clean_text(text: str) -> str:
-        s = text
-
-        for pat, repl in (
-            (r"&#160;", " "),  # HTML-nbsp
-            (r";\.\.\.", r"; ..."),  # ;... → ; ...
-            (r"\s+([,.;:)\]])", r"\1"),  # пробелы перед пунктуацией
-            (r"([(\[])\s+", r"\1"),  # пробелы после открывающих скобок
-            (r"([;:])(?!\s|$)", r"\1 "),  # пробел после ; :
-        ):
-            s = re.sub(pat, repl, s)
-
-        # NBSP
-        s = s.replace("\xa0 ", "\xa0").replace(" \xa0", "\xa0")
-        s = re.sub(r" {2,}", " ", s)
-
-        # Многоточие, если заканчивается на ; или :
-        if re.search(r"(?:;|:)\s*$", s):
-            s = re.sub(r"(?:;|:)\s*$", " ...", s)
-            s = re.sub(r" {2,}", " ", s)
-
-        return s
-
-    def get_extracted_texts(self) -> list[str]:
-        return self.texts.copy()
+    def _concatenate_and_clean_texts(texts: list[str]) -> str:
+        return clean_text(" ".join(texts))
 
 
 if __name__ == "__main__":
@@ -183,7 +195,7 @@ if __name__ == "__main__":
                 document = json.load(f)
 
             cleaned_text = parser.parse(document)
-            extracted_texts = parser.get_extracted_texts()
+            extracted_texts = parser.extract_texts(document)
 
             logger.info(f"Extracted {len(extracted_texts)} text elements:")
             for i, text in enumerate(extracted_texts[:10]):
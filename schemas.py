@@ -1,6 +1,7 @@
 # schemas.py
 
-from pydantic import BaseModel, field_validator
+import msgspec
+from pydantic import BaseModel
 from typing import Any, Dict, List, Optional, Union
 
 class SearchParams(BaseModel):
@@ -19,9 +20,11 @@ class SearchParams(BaseModel):
         extra = "allow"
 
 
-class SearchItem(BaseModel):
-    id: Optional[str] = None
-    moduleId: Optional[str] = None
+class SearchItem(msgspec.Struct, kw_only=True):
+    # id и moduleId приходят из API любыми скалярами (str, int, float); в __post_init__ приводятся к str,
+    # как раньше делал валидатор convert_to_string
+    id: Any = None
+    moduleId: Any = None
     url: Optional[str] = None
     docName: Optional[str] = None
     snippet: Optional[str] = None
@@ -31,24 +34,33 @@ class SearchItem(BaseModel):
     isEtalon: Optional[bool] = None
     isPopular: Optional[bool] = None
 
-    @field_validator("id", "moduleId", mode="before")
-    @classmethod
-    def convert_to_string(cls, v):
-        if v is not None:
-            return str(v)
-        return v
+    def __post_init__(self) -> None:
+        if self.id is not None:
+            self.id = str(self.id)
+        if self.moduleId is not None:
+            self.moduleId = str(self.moduleId)
 
-    class Config:
-        extra = "allow"
+
+class SearchResponse(msgspec.Struct):
+    items: Optional[List[SearchItem]] = None
+
+
+class SearchPageData(msgspec.Struct):
+    searchResponse: SearchResponse
+
+
+class SearchPageResponse(msgspec.Struct):
+    """Ответ страницы поиска: декодируется и валидируется за один проход msgspec.json.decode."""
+    data: SearchPageData
 
 
-class SearchResult(BaseModel):
+class SearchResult(msgspec.Struct, kw_only=True):
     """
     Модель для ОДНОГО результата поиска.
-    Содержит информацию о найденном элементе и сам загруженный документ в виде сырого словаря.
+    Содержит информацию о найденном элементе и сам загруженный документ в виде сырых байт JSON.
     """
     item: SearchItem
-    document: Optional[Dict[str, Any]] = None
+    document: Optional[bytes] = None
     error: Optional[str] = None
 
 # --- НОВЫЙ КЛАСС ---
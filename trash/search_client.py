@@ -1,11 +1,12 @@
 import asyncio
 import logging
 
+import orjson
 from pydantic import HttpUrl
 
 from schemas import SearchResult, UnifiedDoc
 from client import SearchClient
-from parser import DocumentParser
+from parser import DocumentParser, clean_text
 from schemas import SearchParams
 
 logger = logging.getLogger(__name__)
@@ -17,14 +18,13 @@ class ActionSearch:
 
     def __init__(self) -> None:
         self.parser = DocumentParser()
+        self.client = SearchClient()
 
     def search(self, *, search_params: SearchParams, pages: int) -> dict[str, object]:
         return asyncio.run(self.search_async(search_params=search_params, pages=pages))
 
     async def search_async(self, *, search_params: SearchParams, pages: int) -> dict[str, object]:
-        client = SearchClient()
-
-        doc_results = await client.fetch_search_pages_and_docs(
+        doc_results = await self.client.fetch_search_pages_and_docs(
             search_params=search_params,
             pages=pages,
         )
@@ -33,8 +33,7 @@ class ActionSearch:
 
         for search_result in doc_results:
             if search_result.error is not None:
-                item_dict = search_result.item.model_dump()
-                errors.append({"item": item_dict, "error": search_result.error})
+                errors.append({"item": search_result.item, "error": search_result.error})
                 logger.error(
                     "doc fetch error | moduleId=%s id=%s | %s",
                     search_result.item.moduleId,
@@ -44,11 +43,11 @@ class ActionSearch:
                 continue
             try:
                 search_item = search_result.item
-                doc_response = search_result.document
+                doc_response = orjson.loads(search_result.document)
 
                 plain = self.parser.parse(doc_response)
 
-                title = self.parser._clean_text(doc_response["document"]["content"]["title"])
+                title = clean_text(doc_response["document"]["content"]["title"])
 
                 out = {
                     "id": search_item.id,
@@ -66,12 +65,12 @@ class ActionSearch:
                 logger.info("DOC #%s/%s | %s\n%s", out["moduleId"], out["id"], title_str, snippet)
 
             except Exception as e:
-                item_dict = search_result.item.model_dump()
-                errors.append({"item": item_dict, "error": f"parse error: {e}"})
+                errors.append({"item": search_result.item, "error": f"parse error: {e}"})
                 logger.exception("parse error | moduleId=%s id=%s", search_result.item.moduleId, search_result.item.id)
 
         return {
-            "items": [result.item.model_dump() for result in doc_results],
+            # SearchItem отдаются как есть; сериализация (msgspec.to_builtins) — на стороне вызывающего
+            "items": [result.item for result in doc_results],
             "parsed": parsed,
             "errors": errors,
         }
@@ -1,7 +1,10 @@
 import asyncio
+import heapq
 import logging
-from concurrent.futures import ThreadPoolExecutor
-from urllib.parse import urlparse
+import sys
+import threading
+from collections.abc import Coroutine
+from typing import Any, TypeVar
 
 from pydantic import HttpUrl
 
@@ -16,10 +19,35 @@ from search_config import (
 
 from types import SearchResults, UnifiedDoc
 from action_search import ActionSearchClient
+from client import SearchClient
 from yandex_search import YandexSearchClient
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+
+def _with_www_variants(weights: dict[str, float]) -> dict[str, float]:
+    """Добавляет к каждому домену вариант с "www." и без него; явно заданные в конфиге веса имеют приоритет."""
+    expanded: dict[str, float] = {}
+    for host, weight in weights.items():
+        bare = host.removeprefix("www.")
+        expanded.setdefault(sys.intern(bare), weight)
+        expanded.setdefault(sys.intern(f"www.{bare}"), weight)
+    expanded.update((sys.intern(host), weight) for host, weight in weights.items())
+    return expanded
+
+
+def _domain_suffixes(weights: dict[str, float]) -> list[tuple[str, float]]:
+    """Суффиксы ".домен" для поиска веса поддоменов; более длинные (специфичные) идут первыми."""
+    suffixes = {f".{host.removeprefix('www.')}": weight for host, weight in weights.items()}
+    return sorted(suffixes.items(), key=lambda kv: -len(kv[0]))
+
+
+# Считается один раз при импорте, чтобы при ранжировании хватало одного lookup по host
+_DOMAIN_WEIGHTS = _with_www_variants(YANDEX_DOMAIN_WEIGHTS)
+_DOMAIN_SUFFIXES = _domain_suffixes(YANDEX_DOMAIN_WEIGHTS)
+
 
 class JurAgentSearchService:
     """
@@ -29,12 +57,36 @@ class JurAgentSearchService:
     def __init__(self):
         self.action_client = ActionSearchClient()
         self.yandex_client = YandexSearchClient()
+        # Один event loop на весь сервис, работающий в фоновом потоке: HTTP-клиенты и их keep-alive соединения
+        # переживают отдельные вызовы (asyncio.run закрывал бы loop после каждого), а синхронные вызовы
+        # из разных потоков (параллельные вызовы инструментов) выполняются в нём конкурентно, не по очереди
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, name="search-service-loop", daemon=True)
+        self._loop_thread.start()
+
+    def _run(self, coro: Coroutine[Any, Any, T]) -> T:
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def close(self) -> None:
+        """Закрывает HTTP-клиенты сервиса и останавливает его event loop; после этого сервис недоступен."""
+        if self._loop.is_closed():
+            return
+        self._run(self._aclose_clients())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join()
+        self._loop.close()
+
+    async def _aclose_clients(self) -> None:
+        await SearchClient.aclose()
+        await YandexSearchClient.aclose()
+        # Пул потоков loop по умолчанию (asyncio.to_thread для запросов к Yandex API)
+        await self._loop.shutdown_default_executor()
 
     def search_internal(self, query: str, limit: int = 5) -> SearchResults:
         """
         Синхронная обёртка для async поиска во внутренней базе.
         """
-        return asyncio.run(self.search_internal_async(query, limit))
+        return self._run(self.search_internal_async(query, limit))
 
     async def search_internal_async(self, query: str, limit: int = 5) -> SearchResults:
         """
@@ -52,10 +104,11 @@ class JurAgentSearchService:
             for r in raw_docs:
                 url = ACTION_URL_FORMAT.format(moduleId=r["moduleId"], id=r["id"])
                 docs.append(
-                    UnifiedDoc(
+                    # URL собран нами по шаблону ACTION_URL_FORMAT — валидация HttpUrl не нужна
+                    UnifiedDoc.from_trusted(
                         title=r.get("title", "Без заголовка"),
                         content=r.get("plain_text"),
-                        url=HttpUrl(url),
+                        url=url,
                         source="internal",
                         score_rank=ACTION_DEFAULT_SCORE,
                     )
@@ -73,7 +126,7 @@ class JurAgentSearchService:
         """
         Синхронная обёртка для async поиска в Yandex.
         """
-        return asyncio.run(self.search_yandex_async(query, limit))
+        return self._run(self.search_yandex_async(query, limit))
 
     async def search_yandex_async(self, query: str, limit: int = 5) -> SearchResults:
         """
@@ -112,18 +165,23 @@ class JurAgentSearchService:
             return SearchResults(docs=[], meta={"provider": "yandex", "count": "0", "error": str(e)})
 
     def search_everywhere(self, query: str, limit: int = 5) -> SearchResults:
+        """
+        Синхронная обёртка для async поиска во внутренней базе и Yandex.
+        """
+        return self._run(self.search_everywhere_async(query, limit))
+
+    async def search_everywhere_async(self, query: str, limit: int = 5) -> SearchResults:
         """
         Выполняет параллельный поиск во внутренней базе и Yandex.
         """
         logger.info(f"Everywhere search: query='{query}', limit={limit}")
 
-        # Параллельный поиск в обоих источниках
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            future_internal = executor.submit(self.search_internal, query, limit)
-            future_yandex = executor.submit(self.search_yandex, query, limit)
-
-            internal_results = future_internal.result()
-            yandex_results = future_yandex.result()
+        # Параллельный поиск в обоих источниках в одном event loop.
+        # Оба метода сами перехватывают ошибки и возвращают пустой SearchResults.
+        internal_results, yandex_results = await asyncio.gather(
+            self.search_internal_async(query, limit),
+            self.search_yandex_async(query, limit),
+        )
 
         # Объединяем результаты
         all_docs = internal_results.docs + yandex_results.docs
@@ -132,8 +190,8 @@ class JurAgentSearchService:
             logger.warning("No documents found in both sources")
             return SearchResults(docs=[], meta={"provider": "everywhere", "count": "0"})
 
-        # Ранжируем по score и берём топ результатов
-        ranked = sorted(all_docs, key=lambda d: d.score_rank, reverse=True)[:limit]
+        # Ранжируем по score и берём топ результатов: nlargest не сортирует весь список ради первых limit
+        ranked = heapq.nlargest(limit, all_docs, key=lambda d: d.score_rank)
 
         logger.info(
             f"Everywhere search completed: {len(internal_results.docs)} internal + "
@@ -156,7 +214,12 @@ class JurAgentSearchService:
         Ранжирует документы по весу домена для юридической тематики.
         """
         for doc in docs:
-            host = urlparse(str(doc.url)).netloc.lower()
-            doc.score_rank = YANDEX_DOMAIN_WEIGHTS.get(host, YANDEX_DEFAULT_WEIGHT)
+            # HttpUrl уже разобран при валидации, host приходит в нижнем регистре и без порта/учётных данных
+            host = doc.url.host or ""
+            weight = _DOMAIN_WEIGHTS.get(host)
+            if weight is None:
+                # Поддомены (archive.consultant.ru) получают вес ближайшего известного родительского домена
+                weight = next((w for suffix, w in _DOMAIN_SUFFIXES if host.endswith(suffix)), YANDEX_DEFAULT_WEIGHT)
+            doc.score_rank = weight
 
         return sorted(docs, key=lambda d: d.score_rank, reverse=True)
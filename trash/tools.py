@@ -1,15 +1,20 @@
+import functools
 import logging
 
+import orjson
 from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
 
 from search_service import JurAgentSearchService
 from types import UnifiedDoc
-from search_data import SearchDocument, SearchToolResult
 
 logger = logging.getLogger(__name__)
 
-_search_service = JurAgentSearchService()
+
+@functools.cache
+def _get_search_service() -> JurAgentSearchService:
+    """Сервис создаётся при первом вызове инструмента, а не при импорте модуля."""
+    return JurAgentSearchService()
 
 
 def _format_documents(docs: list[UnifiedDoc], total: int) -> str:
@@ -21,6 +26,7 @@ def _format_documents(docs: list[UnifiedDoc], total: int) -> str:
 
     lines = [f"Найдено документов: {total}\n"]
     total_content_size = 0
+    info_enabled = logger.isEnabledFor(logging.INFO)
 
     for i, doc in enumerate(docs, 1):
         lines.append(f"{i}. {doc.title}")
@@ -33,20 +39,24 @@ def _format_documents(docs: list[UnifiedDoc], total: int) -> str:
 
             # Отправляем первые 10000 символов содержимого
             # TODO: Вместо простого обрезания нужно отправлять частями (?)
-            content_preview = doc.content[:10000]
-            lines.append(f"   Содержимое: {content_preview}")
-
-            if len(doc.content) > 10000:
-                lines.append(f"   [Контент обрезан, полный размер: {len(doc.content)} символов]")
-
-            logger.info(
-                f"Document '{doc.title[:50]}...': content_size={content_size}, "
-                f"source={doc.source}, score={doc.score_rank:.2f}"
-            )
+            if content_size > 10000:
+                lines.append(f"   Содержимое: {doc.content[:10000]}")
+                lines.append(f"   [Контент обрезан, полный размер: {content_size} символов]")
+            else:
+                lines.append(f"   Содержимое: {doc.content}")
+
+            if info_enabled:
+                logger.info(
+                    "Document %r: content_size=%d, source=%s, score=%.2f",
+                    doc.title[:50],
+                    content_size,
+                    doc.source,
+                    doc.score_rank,
+                )
 
         lines.append("")
 
-    logger.info(f"Total content size sent to LLM: {total_content_size} characters")
+    logger.info("Formatted %d docs, total content sent to LLM: %d characters", len(docs), total_content_size)
     return "\n".join(lines)
 
 
@@ -55,22 +65,25 @@ def _append_search_ui_marker(text: str, tool_name: str, query: str, docs: list[U
     Добавляет в конец текстового ответа специальный маркер с JSON-пейлоадом
     для UI. Сервис вытащит этот JSON и положит его в custom_data сообщения инструмента.
     """
-    search_result = SearchToolResult(
-        tool_name=tool_name,
-        query=query,
-        documents=[
-            SearchDocument(
-                title=doc.title,
-                url=doc.url,
-                snippet=doc.content[:300] if doc.content else "",
-                source=doc.source,
-            )
+    # Структура совпадает с search_data.SearchToolResult/SearchDocument, но собирается обычными dict:
+    # документы уже провалидированы в UnifiedDoc, повторная валидация pydantic здесь не нужна
+    search_result = {
+        "tool_name": tool_name,
+        "query": query,
+        "documents": [
+            {
+                "title": doc.title,
+                "url": str(doc.url),
+                "snippet": doc.content[:300] if doc.content else "",
+                "source": doc.source,
+            }
             for doc in docs
         ],
-        total_found=len(docs),
-    )
+        "total_found": len(docs),
+    }
 
-    return f"{text}\n\n__SEARCH_TOOL_RESULT__:{search_result.model_dump_json()}"
+    payload = orjson.dumps(search_result).decode()
+    return f"{text}\n\n__SEARCH_TOOL_RESULT__:{payload}"
 
 
 @tool
@@ -104,7 +117,7 @@ def search_internal(query: str, limit: int = 5, config: RunnableConfig | None =
     limit = max(1, min(limit, 10))
 
     try:
-        results = _search_service.search_internal(query, limit)
+        results = _get_search_service().search_internal(query, limit)
 
         return _append_search_ui_marker(
             _format_documents(results.docs, len(results.docs)),
@@ -148,7 +161,7 @@ def search_yandex(query: str, limit: int = 5, config: RunnableConfig | None = No
     limit = max(1, min(limit, 10))
 
     try:
-        results = _search_service.search_yandex(query, limit)
+        results = _get_search_service().search_yandex(query, limit)
 
         return _append_search_ui_marker(
             _format_documents(results.docs, len(results.docs)),
@@ -192,7 +205,7 @@ def search_everywhere(query: str, limit: int = 5, config: RunnableConfig | None
     limit = max(1, min(limit, 10))
 
     try:
-        results = _search_service.search_everywhere(query, limit)
+        results = _get_search_service().search_everywhere(query, limit)
 
         return _append_search_ui_marker(
             _format_documents(results.docs, len(results.docs)),
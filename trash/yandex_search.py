@@ -1,16 +1,26 @@
 import asyncio
+import functools
 import logging
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from typing import Any
+from urllib.parse import urlparse
 
 import aiohttp
-import trafilatura
-from bs4 import BeautifulSoup
+import chardet
+from cachetools import TTLCache
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:  # без selectolax разбираем HTML через BeautifulSoup (html.parser)
+    HTMLParser = None
 
 from search.yandex_search_api import YandexSearchAPIClient
 from search.yandex_search_api.client import SearchType
+from action_search import new_process_pool
+from client import LoopLocal
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +29,39 @@ USER_AGENT = (
     "(KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36 Edg/134.0.0.0"
 )
 DEFAULT_TIMEOUT = 30  # секунд
+PAGE_CACHE_SIZE = 512
+PAGE_CACHE_TTL = 3600  # секунд
+
+# Определение кодировки, когда ни заявленная, ни utf-8 не подошли
+_NON_ASCII = re.compile(rb"[\x80-\xff]")
+_DETECT_SAMPLE_SIZE = 16384
+_MIN_DETECT_CONFIDENCE = 0.5
+_FALLBACK_ENCODING = "cp1251"  # самая частая не-utf-8 кодировка русскоязычных сайтов
+
+_EXTRACT_POOL: ProcessPoolExecutor | None = None
+
+
+def _get_extract_pool() -> ProcessPoolExecutor:
+    global _EXTRACT_POOL
+    if _EXTRACT_POOL is None:
+        _EXTRACT_POOL = new_process_pool()
+    return _EXTRACT_POOL
+
+
+# trafilatura (тянет lxml, justext, dateparser) и bs4 импортируются при первом извлечении текста,
+# то есть в воркерах пула, а не при импорте модуля основным процессом
+@functools.cache
+def _trafilatura() -> Any:
+    import trafilatura
+
+    return trafilatura
+
+
+@functools.cache
+def _beautiful_soup() -> Any:
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup
 
 
 def _get_proxy_config() -> str | None:
@@ -32,23 +75,52 @@ def _get_proxy_config() -> str | None:
 
 def normalize_whitespace(s: str) -> str:
     """Нормализует пробельные символы в тексте."""
-    return re.sub(r"\s+", " ", (s or "").strip())
+    # str.split() без аргументов делит по тем же пробельным символам, что и \s+, но без regex
+    return " ".join(s.split()) if s else ""
 
 
 def _parse_yandex_modtime(modtime_str: str) -> datetime | None:
     """
     Парсит дату из формата Yandex modtime (например, 20250307T093511).
     """
+    # Формат фиксированный, поэтому срезы + int вместо strptime (который каждый раз разбирает шаблон)
     try:
-        return datetime.strptime(modtime_str, "%Y%m%dT%H%M%S")
-    except (ValueError, AttributeError):
-        logger.warning(f"Не удалось распарсить modtime: {modtime_str}")
+        if len(modtime_str) != 15 or modtime_str[8] != "T":
+            return None
+        return datetime(
+            int(modtime_str[0:4]),
+            int(modtime_str[4:6]),
+            int(modtime_str[6:8]),
+            int(modtime_str[9:11]),
+            int(modtime_str[11:13]),
+            int(modtime_str[13:15]),
+        )
+    except (ValueError, IndexError, TypeError):
         return None
 
 
-def _extract_title_from_html(html: str) -> str:
+_NOISE_TAGS = ["script", "style", "header", "footer", "nav", "aside"]
+
+# CSS-селекторы основного текста для доменов с известной вёрсткой: для них trafilatura не запускается.
+# Ключи — хосты без "www.": www-вариант и голый домен считаются одним доменом, как и в весах ранжирования
+_DOMAIN_CONTENT_SELECTORS: dict[str, str] = {
+    "consultant.ru": "div.document-page__content",
+}
+
+
+def _parse_html(html: str) -> Any:
+    """
+    Единственный разбор HTML страницы, общий для заголовка и fallback-текста:
+    дерево selectolax, либо BeautifulSoup, если selectolax не установлен.
     """
-    Извлекает заголовок из HTML.
+    if HTMLParser is not None:
+        return HTMLParser(html or "")
+    return _beautiful_soup()(html or "", "html.parser")
+
+
+def _extract_title(doc: Any) -> str:
+    """
+    Извлекает заголовок из разобранного HTML.
 
     Пытается найти title в следующем порядке:
     1. <title> тег
@@ -56,22 +128,88 @@ def _extract_title_from_html(html: str) -> str:
     3. twitter:title meta
     """
     try:
-        soup = BeautifulSoup(html or "", "html.parser")
-        if soup.title and soup.title.string:
-            t = soup.title.string.strip()
-            if t:
-                return t
-        og = soup.find("meta", property="og:title")
-        if og and og.get("content"):
-            return og["content"].strip()
-        tw = soup.find("meta", attrs={"name": "twitter:title"})
-        if tw and tw.get("content"):
-            return tw["content"].strip()
+        if HTMLParser is not None:
+            title_node = doc.css_first("title")
+            if title_node:
+                t = title_node.text(strip=True)
+                if t:
+                    return t
+            for selector in ('meta[property="og:title"]', 'meta[name="twitter:title"]'):
+                meta = doc.css_first(selector)
+                if meta and meta.attributes.get("content"):
+                    return meta.attributes["content"].strip()
+        else:
+            if doc.title and doc.title.string:
+                t = doc.title.string.strip()
+                if t:
+                    return t
+            og = doc.find("meta", property="og:title")
+            if og and og.get("content"):
+                return og["content"].strip()
+            tw = doc.find("meta", attrs={"name": "twitter:title"})
+            if tw and tw.get("content"):
+                return tw["content"].strip()
     except Exception:
         pass
     return "Без заголовка"
 
 
+def _extract_fallback_text(doc: Any) -> str:
+    """
+    Весь видимый текст страницы без шумовых блоков — для случаев, когда trafilatura ничего не нашла.
+    Удаляет шумовые узлы из doc, поэтому вызывается после _extract_title.
+    """
+    if HTMLParser is not None:
+        for node in doc.css(", ".join(_NOISE_TAGS)):
+            node.decompose()
+        return doc.body.text(separator="\n", strip=True) if doc.body else ""
+
+    for tag in doc(_NOISE_TAGS):
+        tag.decompose()
+    return doc.get_text(separator="\n", strip=True)
+
+
+def _extract_by_selector(doc: Any, selector: str) -> str:
+    """Текст первого узла, подходящего под CSS-селектор, или пустая строка."""
+    if HTMLParser is not None:
+        node = doc.css_first(selector)
+        return node.text(separator="\n", strip=True) if node else ""
+
+    node = doc.select_one(selector)
+    return node.get_text(separator="\n", strip=True) if node else ""
+
+
+def _extract_sync(html: str, url: str = "") -> tuple[str, str]:
+    """
+    Синхронно извлекает (title, content) из HTML: селектор известного домена, иначе trafilatura,
+    при пустом результате — весь текст страницы.
+    """
+    doc = _parse_html(html)
+    title = _extract_title(doc)
+
+    host = (urlparse(url).hostname or "").removeprefix("www.")
+    selector = _DOMAIN_CONTENT_SELECTORS.get(host)
+    if selector:
+        content = _extract_by_selector(doc, selector)
+        if content:
+            return title, normalize_whitespace(content)
+
+    # Извлекаем текст через trafilatura
+    try:
+        # fast: без запасных извлекателей readability/justext — на пустой результат есть свой fallback ниже
+        extracted = (
+            _trafilatura().extract(html, fast=True, favor_precision=True, include_comments=False, include_tables=False)
+            or ""
+        )
+    except Exception:
+        extracted = None
+
+    if extracted:
+        return title, normalize_whitespace(extracted)
+
+    return title, normalize_whitespace(_extract_fallback_text(doc))
+
+
 class YandexSearchClient:
     """
     Generic client для поиска через Yandex Search API без domain-specific логики.
@@ -79,14 +217,70 @@ class YandexSearchClient:
     Выполняет:
     1. Поиск через Yandex API -> получение URL
     2. Асинхронный скрапинг каждого URL
-    3. Извлечение текста через trafilatura (fallback на BeautifulSoup)
+    3. Извлечение текста через trafilatura (fallback на selectolax/BeautifulSoup)
     4. Возврат сырых результатов
     """
 
+    # Кэш извлечённых страниц по URL: популярные страницы повторяются между запросами,
+    # а загрузка и извлечение текста — самая дорогая часть поиска. Кэшируются только успешные результаты.
+    _page_cache: TTLCache[str, dict[str, str]] = TTLCache(maxsize=PAGE_CACHE_SIZE, ttl=PAGE_CACHE_TTL)
+
+    # Общая для всех поисков сессия aiohttp; закрывается через aclose()
+    _sessions: LoopLocal[aiohttp.ClientSession] = LoopLocal()
+
     def __init__(self):
         oauth_token = os.getenv("YANDEX_OAUTH_TOKEN")
         folder_id = os.getenv("YANDEX_FOLDER_ID")
         self.client = YandexSearchAPIClient(folder_id=folder_id, oauth_token=oauth_token)
+        # Прокси читается из окружения один раз, а не на каждый поиск
+        self.proxy = _get_proxy_config()
+        # host -> кодировка, определённая chardet, когда заявленная сервером не подошла
+        self._encoding_cache: dict[str, str] = {}
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        session = self._sessions.get()
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(limit=100, keepalive_timeout=30)
+            session = aiohttp.ClientSession(headers={"User-Agent": USER_AGENT}, connector=connector)
+            self._sessions.set(session)
+        return session
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """Закрывает сессию aiohttp текущего event loop."""
+        session = cls._sessions.pop()
+        if session is not None:
+            await session.close()
+
+    def _decode_html(self, raw: bytes, charset: str | None, host: str) -> str:
+        """
+        Декодирует HTML строго: заявленной в Content-Type кодировкой, затем utf-8, затем определённой ранее для host.
+        utf-8 пробуется раньше кэша: cp1251 декодирует что угодно без ошибок, и устаревший кэш давал бы кракозябры.
+
+        Если ничего не подошло, кодировку определяет chardet по фрагменту с первого не-ASCII байта — ASCII-шапка
+        (скрипты, стили, meta) сбивает детект на 'ascii'. 'ascii' и неуверенный результат заменяются на cp1251.
+        Использованная кодировка кэшируется для host (в том числе cp1251), чтобы chardet не запускался на каждой странице.
+        """
+        cached = self._encoding_cache.get(host)
+        for encoding in dict.fromkeys(enc for enc in (charset, "utf-8", cached) if enc):
+            try:
+                return raw.decode(encoding)
+            except (UnicodeDecodeError, LookupError):
+                continue
+
+        match = _NON_ASCII.search(raw)
+        start = match.start() if match else 0
+        detected = chardet.detect(raw[start : start + _DETECT_SAMPLE_SIZE])
+        encoding = detected["encoding"]
+        if not encoding or encoding.lower() == "ascii" or (detected["confidence"] or 0) < _MIN_DETECT_CONFIDENCE:
+            encoding = _FALLBACK_ENCODING
+        try:
+            text = raw.decode(encoding, errors="ignore")
+        except LookupError:
+            encoding = _FALLBACK_ENCODING
+            text = raw.decode(encoding, errors="ignore")
+        self._encoding_cache[host] = encoding
+        return text
 
     async def _scrape_page(
         self,
@@ -98,6 +292,10 @@ class YandexSearchClient:
         """
         Скрапит одну страницу и извлекает заголовок и текст.
         """
+        cached = self._page_cache.get(url)
+        if cached is not None:
+            return cached
+
         headers = {"User-Agent": USER_AGENT}
 
         own_session = session is None
@@ -109,7 +307,8 @@ class YandexSearchClient:
             async with session.get(url, proxy=proxy, timeout=aiohttp.ClientTimeout(total=timeout)) as r:
                 if r.status != 200:
                     return {"title": "Ошибка", "content": f"HTTP статус: {r.status}"}
-                html = await r.text(errors="ignore")
+                raw = await r.read()
+                html = self._decode_html(raw, r.charset, urlparse(url).netloc)
         except asyncio.TimeoutError:
             logger.warning(f"Тайм-аут при загрузке {url}")
             return {"title": "Ошибка", "content": f"Тайм-аут при загрузке {url}"}
@@ -123,37 +322,18 @@ class YandexSearchClient:
             if own_session:
                 await session.close()
 
-        title = _extract_title_from_html(html)
-
-        # Извлекаем текст через trafilatura
+        # Извлечение текста CPU-bound: выполняется в пуле процессов, чтобы страницы разбирались параллельно
         try:
-            extracted = trafilatura.extract(html, include_comments=False, include_tables=False) or ""
-        except Exception:
-            extracted = None
-
-        if extracted:
-            return {"title": title, "content": normalize_whitespace(extracted)}
-
-        # Fallback: BeautifulSoup
-        try:
-            soup = BeautifulSoup(html, "html.parser")
-
-            # Удаляем шум
-            for tag in soup(["script", "style", "header", "footer", "nav", "aside"]):
-                tag.decompose()
-
-            content = soup.get_text(separator="\n", strip=True)
-            content = normalize_whitespace(content)
-
-            # Еще одна попытка извлечь title из soup
-            if (not title or title == "Без заголовка") and soup.title and soup.title.string:
-                title = soup.title.string.strip() or "Без заголовка"
-
-            return {"title": title, "content": content}
+            loop = asyncio.get_running_loop()
+            title, content = await loop.run_in_executor(_get_extract_pool(), _extract_sync, html, url)
         except Exception as e:
             logger.exception(f"Ошибка при обработке HTML для {url}")
             return {"title": "Ошибка", "content": f"Ошибка при обработке HTML: {e}"}
 
+        page = {"title": title, "content": content}
+        self._page_cache[url] = page
+        return page
+
     async def search(
         self, query: str, num_results: int = 5, search_type: SearchType = SearchType.RUSSIAN
     ) -> list[dict[str, Any]]:
@@ -161,7 +341,10 @@ class YandexSearchClient:
         Выполняет поиск в Yandex и асинхронно скрапит страницы.
         """
         try:
-            search_results = self.client.get_links(query_text=query, search_type=search_type, n_links=num_results)
+            # get_links синхронный: выполняем в потоке, чтобы не блокировать параллельные поиски в том же loop
+            search_results = await asyncio.to_thread(
+                self.client.get_links, query_text=query, search_type=search_type, n_links=num_results
+            )
 
             if not search_results:
                 logger.warning(f"Yandex не вернул ссылок для запроса: {query}")
@@ -170,12 +353,9 @@ class YandexSearchClient:
             logger.info(f"Yandex вернул {len(search_results)} ссылок, начинаю скрапинг...")
 
             # Параллельный асинхронный скрапинг
-            proxy_url = _get_proxy_config()
-            headers = {"User-Agent": USER_AGENT}
-
-            async with aiohttp.ClientSession(headers=headers) as session:
-                tasks = [self._scrape_page(item["url"], session=session, proxy=proxy_url) for item in search_results]
-                pages = await asyncio.gather(*tasks, return_exceptions=True)
+            session = await self._get_session()
+            tasks = [self._scrape_page(item["url"], session=session, proxy=self.proxy) for item in search_results]
+            pages = await asyncio.gather(*tasks, return_exceptions=True)
 
             processed_items: list[dict[str, Any]] = []
             errors = 0
@@ -212,11 +392,17 @@ class YandexSearchClient:
 if __name__ == "__main__":
     logging.basicConfig(level=logging.DEBUG, format="%(levelname)s: %(message)s")
 
+    async def run_example(client: YandexSearchClient, query: str) -> list[dict[str, Any]]:
+        try:
+            return await client.search(query=query, num_results=3)
+        finally:
+            await YandexSearchClient.aclose()
+
     try:
         yandex_client = YandexSearchClient()
 
         test_query = "когда сдавать баланс за 2024 год в ГИР БО"
-        results = asyncio.run(yandex_client.search(query=test_query, num_results=3))
+        results = asyncio.run(run_example(yandex_client, test_query))
 
         print(f"\nНайдено документов: {len(results)}")
 
@@ -1,4 +1,4 @@
-from typing import Literal
+from typing import Any, Literal
 from datetime import datetime
 # from typing_extensions import Literal
 
@@ -20,6 +20,15 @@ class UnifiedDoc(BaseModel):
     def serialize_url(self, v: HttpUrl) -> str:
         return str(v)
 
+    @classmethod
+    def from_trusted(cls, *, url: str, **fields: Any) -> "UnifiedDoc":
+        """
+        Создаёт документ без валидации — только для URL и полей, которые мы собрали сами
+        (например, по ACTION_URL_FORMAT). url остаётся строкой, а не HttpUrl.
+        Внешние данные (выдача Yandex) создаются обычным конструктором.
+        """
+        return cls.model_construct(url=url, **fields)
+
 
 class SearchResults(BaseModel):
     docs: list[UnifiedDoc] = []